@@ -1,52 +1,98 @@
 import ics
+import json
+import sys
 from pathlib import Path
 
 from .utils import (
-    make_event_from_github_discussion_body,
-    are_events_identical,
-    load_events_from_calendar_file,
+    EventFormParserError,
+    parse_github_discussion_form,
+    make_event_from_form_fields,
+    compute_form_content_hash,
+    get_raw_event_content_hash,
+    load_calendar_file,
+    read_raw_events,
+    serialize_calendar,
+    extract_event_calendar,
     write_events_to_calendar,
 )
 
 
 def process_discussion(
     discussion_number: str, body: str, data_dir: Path = Path("data/")
-) -> tuple[ics.Event, bool]:
+) -> tuple[ics.Event | None, bool]:
     """Process a GitHub discussion by creating or updating a calendar event.
     
     Returns:
-        tuple: (event, was_updated) where was_updated is False if no changes were made
+        tuple: (event, was_updated) where was_updated is False (and event is
+        None, as no event is built) if no changes were made
     """
-    event_uid = f"ghdiscussion_{discussion_number}"
-    new_event = make_event_from_github_discussion_body(event_uid, body)
+    return process_discussions([(discussion_number, body)], data_dir)[0]
+
+
+def process_discussions(
+    items: list[tuple[str, str]], data_dir: Path = Path("data/")
+) -> list[tuple[ics.Event | None, bool]]:
+    """Process several GitHub discussions, reading and writing the calendar once.
     
-    # Load existing events
-    full_calendar_path = data_dir / "adsv_events_public.ics"
-    all_events = load_events_from_calendar_file(full_calendar_path)
+    Each item is a (discussion_number, body) pair. All items are parsed
+    before anything is written, so a parse error leaves the files untouched.
     
-    # Find existing event with matching UID
-    existing_event_idx = None
-    for i, event in enumerate(all_events):
-        if event.uid == event_uid:
-            existing_event_idx = i
-            break
+    Returns:
+        list: (event, was_updated) for each item, in order (see
+        ``process_discussion``)
+    """
+    # Compare content hashes against the existing raw VEVENT blocks (events
+    # written before hashes were stored have none and are always rewritten)
+    full_calendar_path = data_dir / "adsv_events_public.ics"
+    _, raw_events, _ = read_raw_events(full_calendar_path)
+    stored_hashes = {
+        uid: get_raw_event_content_hash(block) for uid, block, _ in raw_events
+    }
     
-    if existing_event_idx is not None:
-        if are_events_identical(all_events[existing_event_idx], new_event):
-            print("No changes detected; skipping update.")
-            return new_event, False
-        all_events[existing_event_idx] = new_event
-        print("Event updated.")
-    else:
-        all_events.insert(0, new_event)
-        print("Event added.")
+    calendar = None
+    events_by_uid = {}
+    updated_uids = {}
+    results = []
+    for discussion_number, body in items:
+        event_uid = f"ghdiscussion_{discussion_number}"
+        fields = parse_github_discussion_form(body)
+        new_hash = compute_form_content_hash(fields)
+        
+        # Unchanged form content: skip building the event altogether
+        if event_uid in stored_hashes and stored_hashes[event_uid] == new_hash:
+            print(f"No changes detected for {event_uid}; skipping update.")
+            results.append((None, False))
+            continue
+        
+        new_event = make_event_from_form_fields(event_uid, fields)
+        
+        # Load the calendar (only once something changes) and swap the event in place
+        if calendar is None:
+            calendar = load_calendar_file(full_calendar_path)
+            events_by_uid = {event.uid: event for event in calendar.events}
+        
+        if event_uid in events_by_uid:
+            calendar.events.discard(events_by_uid[event_uid])
+            print(f"Event {event_uid} updated.")
+        else:
+            print(f"Event {event_uid} added.")
+        calendar.events.add(new_event)
+        events_by_uid[event_uid] = new_event
+        stored_hashes[event_uid] = new_hash
+        updated_uids[event_uid] = None
+        results.append((new_event, True))
     
-    # Save files
-    event_path = data_dir / f"individual_events/{event_uid}.ics"
-    write_events_to_calendar([new_event], event_path)
-    write_events_to_calendar(all_events, full_calendar_path)
+    # Save files (serialize once, cut the individual events out of the result)
+    if calendar is not None:
+        calendar_str = serialize_calendar(calendar)
+        for event_uid in updated_uids:
+            event_path = data_dir / f"individual_events/{event_uid}.ics"
+            write_events_to_calendar(
+                extract_event_calendar(calendar_str, event_uid), event_path
+            )
+        write_events_to_calendar(calendar_str, full_calendar_path, calendar)
     
-    return new_event, True
+    return results
 
 
 def delete_discussion(discussion_number: str, data_dir: Path = Path("data/")) -> bool:
@@ -69,11 +115,20 @@ def delete_discussion(discussion_number: str, data_dir: Path = Path("data/")) ->
     
     # Remove from main calendar
     if full_calendar_path.exists():
-        all_events = load_events_from_calendar_file(full_calendar_path)
-        filtered_events = [e for e in all_events if e.uid != event_uid]
+        # Drop the raw VEVENT block; everything else (other events and any
+        # components between them) is written back verbatim
+        header, raw_events, footer = read_raw_events(full_calendar_path)
+        uid_index = {uid: i for i, (uid, _, _) in enumerate(raw_events)}
         
-        if len(filtered_events) < len(all_events):
-            write_events_to_calendar(filtered_events, full_calendar_path)
+        if event_uid in uid_index:
+            _, _, between = raw_events[uid_index[event_uid]]
+            raw_events[uid_index[event_uid]] = (event_uid, "", between)
+            calendar_str = (
+                header
+                + "".join(block + between for _, block, between in raw_events)
+                + footer
+            )
+            write_events_to_calendar(calendar_str, full_calendar_path)
             print(f"Removed event {event_uid} from main calendar.")
             event_removed = True
     
@@ -83,6 +138,42 @@ def delete_discussion(discussion_number: str, data_dir: Path = Path("data/")) ->
     return event_removed
 
 
+def _read_batch_file(path: Path) -> list[tuple[str, str]]:
+    """Read (discussion_number, body) items from a JSONL file.
+
+    Raises:
+        ValueError: if a line is not a valid item (the message starts with
+            its line number)
+    """
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                if not isinstance(item, dict):
+                    raise ValueError("expected a JSON object")
+                discussion_number = item["discussion_number"]
+                body = item["body"]
+            except (ValueError, KeyError) as e:
+                raise ValueError(f"line {line_number}: {e!r}") from e
+            if isinstance(discussion_number, bool) or not (
+                isinstance(discussion_number, int)
+                or (isinstance(discussion_number, str) and discussion_number.strip())
+            ):
+                raise ValueError(
+                    f"line {line_number}: discussion_number must be an integer "
+                    f"or a non-empty string, got {discussion_number!r}"
+                )
+            if not isinstance(body, str):
+                raise ValueError(
+                    f"line {line_number}: body must be a string, got {body!r}"
+                )
+            items.append((str(discussion_number).strip(), body))
+    return items
+
+
 def main():
     """CLI entry point for calendar bot."""
     import argparse
@@ -90,8 +181,14 @@ def main():
     parser = argparse.ArgumentParser(
         description="Process GitHub discussions to manage calendar events"
     )
-    parser.add_argument("--discussion_number", required=True, help="GitHub discussion number")
+    parser.add_argument("--discussion_number", help="GitHub discussion number")
     parser.add_argument("--body", help="Discussion body content (required unless --delete)")
+    parser.add_argument(
+        "--batch",
+        type=Path,
+        help="JSONL file of {\"discussion_number\": ..., \"body\": ...} items to "
+        "create/update in one pass (replaces --discussion_number/--body)",
+    )
     parser.add_argument(
         "--delete",
         action="store_true",
@@ -102,12 +199,36 @@ def main():
     )
     args = parser.parse_args()
 
+    if args.batch is not None:
+        if (
+            args.delete
+            or args.discussion_number is not None
+            or args.body is not None
+        ):
+            parser.error("--batch cannot be combined with other event arguments")
+    elif args.discussion_number is None:
+        parser.error("--discussion_number is required unless using --batch")
+
     if args.delete:
         delete_discussion(args.discussion_number, args.data_dir)
     else:
-        if args.body is None:
+        if args.batch is not None:
+            try:
+                items = _read_batch_file(args.batch)
+            except OSError as e:
+                parser.error(f"cannot read --batch file: {e}")
+            except ValueError as e:
+                parser.error(f"invalid --batch item on {e}")
+        elif args.body is None:
             parser.error("--body is required when not using --delete")
-        process_discussion(args.discussion_number, args.body, args.data_dir)
+        else:
+            items = [(args.discussion_number, args.body)]
+        try:
+            process_discussions(items, args.data_dir)
+        except EventFormParserError as e:
+            # The workflow picks up lines with this prefix from stderr
+            print(f"EventFormParserError: {e}", file=sys.stderr)
+            sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,38 @@
+import copy
+import hashlib
 import ics
+import os
+import re
 from datetime import datetime, timedelta
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 from pathlib import Path
-from re import match
+from ics.grammar.parse import ContentLine
+
+_VEVENT_RE = re.compile(r"^BEGIN:VEVENT\r?\n.*?^END:VEVENT(?:\r?\n|$)", re.M | re.S)
+_UID_RE = re.compile(r"^UID:([^\r\n]*)", re.M)
+_SINGLE_EVENT_CALENDAR_HEADER = (
+    "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:ics.py - http://git.io/lLljaA\r\n"
+)
+_SINGLE_EVENT_CALENDAR_FOOTER = "END:VCALENDAR"
+
+_CONTENT_HASH_PROPERTY = "X-CONTENT-SHA256"
+_CONTENT_HASH_RE = re.compile(rf"^{_CONTENT_HASH_PROPERTY}:([0-9a-f]+)", re.M)
+# Hashed together with the form fields. Bump whenever the way events are built
+# from the form changes, so that unchanged discussions are rebuilt with it.
+_EVENT_FORMAT_VERSION = "1"
+
+# Parsed calendars by path, valid while the file's (mtime_ns, size) is unchanged
+_CALENDAR_CACHE: dict[Path, tuple[int, int, ics.Calendar]] = {}
+
+# Kept as a tuple (not a set) so the reported missing field is deterministic
+_REQUIRED_FIELDS = (
+    "Event Name",
+    "Event Description",
+    "Start Time",
+    "End Time",
+    "Location",
+)
 
 
 def make_event_from_github_discussion_body(
@@ -21,49 +51,57 @@ def make_event_from_github_discussion_body(
 
     etc.
     """
+    fields = parse_github_discussion_form(body)
+    return make_event_from_form_fields(event_uid, fields, timezone_ianacode)
+
+
+def parse_github_discussion_form(body: str) -> dict[str, str]:
+    """Parse a GitHub discussion form body into a {header: value} dict.
+
+    Only the presence of the required fields is checked here; their values
+    are validated when the event is built (see ``make_event_from_form_fields``).
+    """
+    # Parse the form-style body: every "### " line starts a new field; any
+    # text before the first header is ignored and blank lines are dropped
+    fields = {}
+    for chunk in ("\n" + body.strip()).split("\n### ")[1:]:
+        header, _, content = chunk.partition("\n")
+        header = header.strip()
+        if not header:
+            continue
+        content = content.strip()
+        if "\n" in content:
+            # Already stripped as a whole, so only blank lines need dropping
+            content = "\n".join(filter(str.strip, content.split("\n")))
+        fields[header] = content
+
+    # Validate required fields
+    missing = [field for field in _REQUIRED_FIELDS if not fields.get(field)]
+    if missing:
+        raise EventFormParserError(f"Missing required field: {missing[0]}")
+
+    return fields
+
+
+def make_event_from_form_fields(
+    event_uid: str, fields: dict[str, str], timezone_ianacode: str = "Europe/Zurich"
+) -> ics.Event:
+    """Build an iCalendar event from parsed discussion form fields."""
     try:
-        tzinfo = ZoneInfo(timezone_ianacode)
+        tzinfo = _get_tzinfo(timezone_ianacode)
     except Exception as e:
         raise EventFormParserError(
             f"Invalid timezone IANA code: {timezone_ianacode}"
         ) from e
 
-    # Parse the form-style body
-    fields = {}
-    lines = body.strip().split("\n")
-
-    current_field = None
-    current_content = []
-
-    for line in lines:
-        if line.startswith("### "):
-            # Save previous field if exists
-            if current_field:
-                fields[current_field] = "\n".join(current_content).strip()
-            # Start new field
-            current_field = line[4:].strip()
-            current_content = []
-        elif current_field and line.strip():
-            current_content.append(line)
-
-    # Save last field
-    if current_field:
-        fields[current_field] = "\n".join(current_content).strip()
-
-    # Validate required fields
-    required_fields = [
-        "Event Name",
-        "Event Description",
-        "Start Time",
-        "End Time",
-        "Location",
-    ]
-    for field in required_fields:
-        if field not in fields or not fields[field]:
-            raise EventFormParserError(f"Missing required field: {field}")
-
     # Create event
     event = ics.Event(uid=event_uid)
+    event.extra.append(
+        ContentLine(
+            _CONTENT_HASH_PROPERTY,
+            value=compute_form_content_hash(fields, timezone_ianacode),
+        )
+    )
     event.name = _parse_event_name(fields["Event Name"])
     event.description = _parse_event_description(fields["Event Description"])
     event.location = _parse_location(fields["Location"])
@@ -88,34 +126,145 @@ def make_event_from_github_discussion_body(
     return event
 
 
-def are_events_identical(event1: ics.Event, event2: ics.Event) -> bool:
-    """Check if two events have identical content (ignoring UID)."""
+def compute_form_content_hash(
+    fields: dict[str, str], timezone_ianacode: str = "Europe/Zurich"
+) -> str:
+    """Hash the required form fields (and timezone) an event is built from.
+
+    The event format version is included, so that bumping it invalidates
+    all stored hashes.
+    """
+    values = [fields[field] for field in _REQUIRED_FIELDS]
+    values += [timezone_ianacode, _EVENT_FORMAT_VERSION]
+    return hashlib.sha256("\0".join(values).encode("utf-8")).hexdigest()
+
+
+def get_raw_event_content_hash(raw_block: str) -> str | None:
+    """Get the form content hash stored in a raw VEVENT block, if any."""
+    hash_match = _CONTENT_HASH_RE.search(raw_block)
+    return hash_match.group(1) if hash_match else None
+
+
+def load_calendar_file(filepath: Path) -> ics.Calendar:
+    """Load an iCalendar file (an empty calendar if it does not exist).
+
+    Parsed calendars (and calendars written by ``write_events_to_calendar``)
+    are cached until the file's mtime or size changes. A deep copy is
+    returned, so callers may modify the calendar and its events freely.
+    """
+    try:
+        stat = filepath.stat()
+    except FileNotFoundError:
+        return ics.Calendar()
+    cached = _CALENDAR_CACHE.get(filepath)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return copy.deepcopy(cached[2])
+
+    with open(filepath, "r", encoding="utf-8") as f:
+        text = f.read()
+    calendar = ics.Calendar(text)
+    if "CALSCALE:" not in text:
+        # ics fills in a default scale on parse; don't add it to files we rewrite
+        calendar.scale = None
+    _CALENDAR_CACHE[filepath] = (stat.st_mtime_ns, stat.st_size, calendar)
+    return copy.deepcopy(calendar)
+
+
+def load_events_from_calendar_file(filepath: Path) -> set[ics.Event]:
+    """Load events from an iCalendar file (the calendar's own event set)."""
+    return load_calendar_file(filepath).events
+
+
+def read_raw_events(
+    filepath: Path,
+) -> tuple[str, list[tuple[str, str, str]], str]:
+    """Split an iCalendar file into its header, raw VEVENT blocks and footer.
+
+    Events are not parsed: each VEVENT block is returned verbatim together
+    with its UID and any text between it and the next VEVENT (e.g. a
+    VTIMEZONE), so that ``header + "".join(block + between for ...) + footer``
+    reproduces the file.
+
+    Returns:
+        tuple: (header, [(uid, raw_block, between), ...], footer)
+    """
+    if not filepath.exists():
+        return "", [], ""
+    with open(filepath, "r", encoding="utf-8", newline="") as f:
+        text = f.read()
+
+    block_matches = list(_VEVENT_RE.finditer(text))
+    if not block_matches:
+        return text, [], ""
+
+    raw_events = []
+    for block_match, next_match in zip(block_matches, block_matches[1:] + [None]):
+        block = block_match.group()
+        uid_match = _UID_RE.search(block)
+        between = text[block_match.end():next_match.start()] if next_match else ""
+        raw_events.append((uid_match.group(1) if uid_match else "", block, between))
+    header = text[: block_matches[0].start()]
+    footer = text[block_matches[-1].end():]
+    return header, raw_events, footer
+
+
+def serialize_calendar(calendar: ics.Calendar) -> str:
+    """Serialize a calendar into an iCalendar string."""
+    return "".join(calendar.serialize_iter())
+
+
+def extract_event_calendar(calendar_str: str, event_uid: str) -> str:
+    """Cut a single-event iCalendar string out of a serialized calendar.
+
+    The VEVENT block of ``event_uid`` is wrapped in a bare VERSION/PRODID
+    calendar (calendar-level properties and other components of
+    ``calendar_str`` are not copied), so the event does not have to be
+    serialized twice.
+    """
+    begin, end = "BEGIN:VEVENT\r\n", "END:VEVENT\r\n"
+    uid_pos = calendar_str.index(f"\r\nUID:{event_uid}\r\n")
+    block_start = calendar_str.rindex(begin, 0, uid_pos)
+    block_end = calendar_str.index(end, uid_pos) + len(end)
     return (
-        event1.name == event2.name
-        and event1.description == event2.description
-        and event1.begin == event2.begin
-        and event1.end == event2.end
-        and event1.location == event2.location
+        _SINGLE_EVENT_CALENDAR_HEADER
+        + calendar_str[block_start:block_end]
+        + _SINGLE_EVENT_CALENDAR_FOOTER
     )
 
 
-def load_events_from_calendar_file(filepath: Path) -> list[ics.Event]:
-    """Load events from an iCalendar file."""
-    if not filepath.exists():
-        return []
-    with open(filepath, "r") as f:
-        calendar = ics.Calendar(f.read())
-    return list(calendar.events)
+def write_events_to_calendar(
+    calendar_str: str, filepath: Path, calendar: ics.Calendar | None = None
+) -> None:
+    """Write a serialized calendar to an iCalendar file.
 
+    The data is encoded once and written in binary mode (no newline
+    translation, so CRLF line endings are kept as-is) to a temporary file next
+    to ``filepath`` in one call, then moved into place, so readers never see a
+    half-written calendar.
 
-def write_events_to_calendar(events: list[ics.Event], filepath: Path) -> None:
-    """Write events to an iCalendar file."""
-    calendar = ics.Calendar()
-    for event in events:
-        calendar.events.add(event)
+    If the ``calendar`` that ``calendar_str`` was serialized from is given, a
+    copy of it is cached so that the next ``load_calendar_file`` of
+    ``filepath`` does not have to parse the file again.
+    """
+    _CALENDAR_CACHE.pop(filepath, None)
     filepath.parent.mkdir(parents=True, exist_ok=True)
-    with open(filepath, "w") as f:
-        f.writelines(calendar.serialize_iter())
+    tmp_path = filepath.with_suffix(filepath.suffix + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(calendar_str.encode("utf-8"))
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        # Don't leave the temporary file behind in the (published) data dir
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    if calendar is not None:
+        stat = filepath.stat()
+        _CALENDAR_CACHE[filepath] = (
+            stat.st_mtime_ns,
+            stat.st_size,
+            copy.deepcopy(calendar),
+        )
 
 
 def _parse_event_name(name_str: str) -> str:
@@ -127,6 +276,8 @@ def _parse_event_name(name_str: str) -> str:
 
 def _parse_event_description(desc_str: str) -> str:
     """Parse event description (can be multi-line)."""
+    if "```" not in desc_str:
+        return desc_str.strip()
     lines = desc_str.strip().split("\n")
     lines = [line for line in lines if not line.startswith("```")]
     return "\n".join(lines).strip()
@@ -140,14 +291,22 @@ def _parse_time(time_str: str) -> tuple[datetime, bool]:
     """
     time_str = time_str.strip()
 
-    # Try full datetime format
+    # Fast path for the canonical zero-padded formats
+    try:
+        if len(time_str) == 19:
+            return _fast_parse_dt(time_str), False
+        if len(time_str) == 10:
+            return _fast_parse_date(time_str), True
+    except ValueError:
+        pass
+
+    # Fall back to strptime, which also accepts e.g. unpadded fields
     try:
         dt = datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
         return dt, False
     except ValueError:
         pass
 
-    # Try date-only format
     try:
         dt = datetime.strptime(time_str, "%Y-%m-%d")
         return dt, True
@@ -159,6 +318,30 @@ def _parse_time(time_str: str) -> tuple[datetime, bool]:
     )
 
 
+def _fast_parse_date(s: str) -> datetime:
+    """Parse a 'YYYY-MM-DD' string by fixed offsets (raises ValueError)."""
+    if s[4] != "-" or s[7] != "-" or not (s[0:4] + s[5:7] + s[8:10]).isdigit():
+        raise ValueError(s)
+    return datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]))
+
+
+def _fast_parse_dt(s: str) -> datetime:
+    """Parse a 'YYYY-MM-DD HH:MM:SS' string by fixed offsets (raises ValueError)."""
+    if s[10] != " " or s[13] != ":" or s[16] != ":":
+        raise ValueError(s)
+    if not (s[11:13] + s[14:16] + s[17:19]).isdigit():
+        raise ValueError(s)
+    return _fast_parse_date(s[0:10]).replace(
+        hour=int(s[11:13]), minute=int(s[14:16]), second=int(s[17:19])
+    )
+
+
+@lru_cache(maxsize=32)
+def _get_tzinfo(timezone_ianacode: str) -> ZoneInfo:
+    """Look up (and cache) the tzinfo for an IANA timezone code."""
+    return ZoneInfo(timezone_ianacode)
+
+
 def _parse_location(loc_str: str) -> str:
     """Parse and validate location (must be single line)."""
     if "\n" in loc_str:
@@ -168,7 +351,3 @@ def _parse_location(loc_str: str) -> str:
 
 class EventFormParserError(Exception):
     """Exception raised when parsing GitHub discussion form fails."""
-
-    def __init__(self, message: str):
-        print(f"EventFormParserError: {message}", flush=True)
-        super().__init__(message)
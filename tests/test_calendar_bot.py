@@ -1,7 +1,15 @@
+import io
+import ics
 import unittest
 from pathlib import Path
-from calendar_bot.update_calendar import process_discussion, delete_discussion
-from calendar_bot.utils import load_events_from_calendar_file
+from unittest import mock
+from calendar_bot.update_calendar import (
+    main,
+    process_discussion,
+    process_discussions,
+    delete_discussion,
+)
+from calendar_bot.utils import load_events_from_calendar_file, EventFormParserError
 
 
 class TestCalendarBot(unittest.TestCase):
@@ -54,6 +62,37 @@ SV Lobby"""
         self.assertTrue((self.data_dir / "adsv_events_public.ics").exists())
         self.assertTrue((self.data_dir / "individual_events/ghdiscussion_test_add.ics").exists())
 
+    def test_individual_event_file(self):
+        """Test that the individual event file holds only its own event."""
+        process_discussion("test_other", self.discussion_body, self.data_dir)
+        
+        # Calendar-level properties of the main calendar must not leak through
+        calendar_path = self.data_dir / "adsv_events_public.ics"
+        content = calendar_path.read_bytes().replace(
+            b"PRODID:ics.py - http://git.io/lLljaA\r\n",
+            b"PRODID:ics.py - http://git.io/lLljaA\r\nX-WR-CALNAME:ADSV\r\nMETHOD:PUBLISH\r\n",
+        )
+        calendar_path.write_bytes(content)
+        process_discussion("test_individual", self.discussion_body, self.data_dir)
+        
+        event_file = self.data_dir / "individual_events/ghdiscussion_test_individual.ics"
+        content = event_file.read_text(encoding="utf-8")
+        self.assertEqual(content.count("BEGIN:VEVENT"), 1)
+        self.assertIn("\nUID:ghdiscussion_test_individual\n", content)
+        self.assertNotIn("X-WR-CALNAME", content)
+        self.assertNotIn("METHOD", content)
+        self.assertEqual(
+            [e.uid for e in ics.Calendar(content).events], ["ghdiscussion_test_individual"]
+        )
+
+    def test_failed_write_leaves_no_tmp_file(self):
+        """Test that a failed calendar write does not leave a .tmp file behind."""
+        with mock.patch("calendar_bot.utils.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                process_discussion("test_failed_write", self.discussion_body, self.data_dir)
+        
+        self.assertEqual(list(self.data_dir.rglob("*.tmp")), [])
+
     def test_update_unchanged_event(self):
         """Test that unchanged event is not re-saved."""
         # Create event
@@ -63,6 +102,7 @@ SV Lobby"""
         event, was_updated = process_discussion("test_unchanged", self.discussion_body, self.data_dir)
         
         self.assertFalse(was_updated)
+        self.assertIsNone(event)
 
     def test_update_changed_event(self):
         """Test updating an existing event with changes."""
@@ -76,6 +116,34 @@ SV Lobby"""
         self.assertTrue(was_updated)
         self.assertEqual(event.name, "😃 ADSV Holiday Party")
 
+    def test_update_event_without_content_hash(self):
+        """Test that an event stored without a content hash is rewritten once."""
+        process_discussion("test_nohash", self.discussion_body, self.data_dir)
+        
+        # Strip the stored hash, as in calendars written by older versions
+        calendar_path = self.data_dir / "adsv_events_public.ics"
+        content = calendar_path.read_bytes()
+        content = b"".join(
+            line for line in content.splitlines(keepends=True)
+            if not line.startswith(b"X-CONTENT-SHA256:")
+        )
+        calendar_path.write_bytes(content)
+        
+        _, was_updated = process_discussion("test_nohash", self.discussion_body, self.data_dir)
+        self.assertTrue(was_updated)
+        _, was_updated = process_discussion("test_nohash", self.discussion_body, self.data_dir)
+        self.assertFalse(was_updated)
+
+    def test_update_after_event_format_change(self):
+        """Test that bumping the event format version rebuilds unchanged events."""
+        process_discussion("test_format", self.discussion_body, self.data_dir)
+        
+        with mock.patch("calendar_bot.utils._EVENT_FORMAT_VERSION", "test"):
+            event, was_updated = process_discussion("test_format", self.discussion_body, self.data_dir)
+        
+        self.assertTrue(was_updated)
+        self.assertIsNotNone(event)
+
     def test_fullday_event(self):
         """Test creating an all-day event."""
         fullday_body = self.discussion_body.replace(
@@ -88,6 +156,39 @@ SV Lobby"""
         self.assertTrue(was_updated)
         self.assertTrue(event.all_day)
 
+    def test_invalid_time_format(self):
+        """Test that malformed times are rejected."""
+        for bad_time in ("2024-11-30T17:00:00", "2024/11/30", "2024-13-30", "2024-11-30 25:00:00"):
+            bad_body = self.discussion_body.replace("2024-11-30 17:00:00", bad_time)
+            with self.assertRaises(EventFormParserError):
+                process_discussion("test_invalid_time", bad_body, self.data_dir)
+
+    def test_loose_time_format(self):
+        """Test that unpadded and loosely spaced times are still accepted."""
+        for loose_time, expected in (
+            ("2024-11-30 9:00:00", "2024-11-30 09:00:00"),
+            ("2024-11-30 17:0:0", "2024-11-30 17:00:00"),
+            ("2024-11-30\t17:00:00", "2024-11-30 17:00:00"),
+        ):
+            loose_body = self.discussion_body.replace("2024-11-30 17:00:00", loose_time)
+            event, _ = process_discussion("test_loose_time", loose_body, self.data_dir)
+            self.assertEqual(event.begin.to("Europe/Zurich").format("YYYY-MM-DD HH:mm:ss"), expected)
+        
+        fullday_body = self.discussion_body.replace(
+            "2024-11-30 17:00:00\n\n### End Time\n\n2024-11-30 21:00:00",
+            "2024-1-5\n\n### End Time\n\n2024-1-6",
+        )
+        event, _ = process_discussion("test_loose_time", fullday_body, self.data_dir)
+        self.assertTrue(event.all_day)
+        self.assertEqual(event.begin.format("YYYY-MM-DD"), "2024-01-05")
+
+    def test_missing_required_field(self):
+        """Test that the first missing required field is reported."""
+        bad_body = self.discussion_body.replace("SV Lobby", "")
+        bad_body = bad_body.replace("2024-11-30 17:00:00", "")
+        with self.assertRaisesRegex(EventFormParserError, "Missing required field: Start Time"):
+            process_discussion("test_missing_field", bad_body, self.data_dir)
+
     def test_delete_event(self):
         """Test deleting an event."""
         # Create event
@@ -107,6 +208,28 @@ SV Lobby"""
         event_uids = [e.uid for e in events]
         self.assertNotIn("ghdiscussion_test_delete", event_uids)
 
+    def test_delete_keeps_components_between_events(self):
+        """Test that deleting an event keeps other components verbatim."""
+        process_discussion("test_keep_1", self.discussion_body, self.data_dir)
+        process_discussion("test_keep_2", self.discussion_body, self.data_dir)
+        process_discussion("test_keep_3", self.discussion_body, self.data_dir)
+        
+        # Put a VTIMEZONE and a calendar property after every event but the last
+        calendar_path = self.data_dir / "adsv_events_public.ics"
+        extra = (
+            b"BEGIN:VTIMEZONE\r\nTZID:Europe/Zurich\r\nEND:VTIMEZONE\r\n"
+            b"X-WR-CALNAME:ADSV\r\n"
+        )
+        content = calendar_path.read_bytes()
+        head, sep, tail = content.rpartition(b"END:VEVENT\r\n")
+        content = head.replace(b"END:VEVENT\r\n", b"END:VEVENT\r\n" + extra) + sep + tail
+        calendar_path.write_bytes(content)
+        
+        for discussion_number in ("test_keep_1", "test_keep_2", "test_keep_3"):
+            self.assertTrue(delete_discussion(discussion_number, self.data_dir))
+            self.assertEqual(calendar_path.read_bytes().count(extra), 2)
+        self.assertNotIn(b"BEGIN:VEVENT", calendar_path.read_bytes())
+
     def test_delete_nonexistent_event(self):
         """Test deleting a non-existent event."""
         removed = delete_discussion("test_nonexistent", self.data_dir)
@@ -128,7 +251,122 @@ SV Lobby"""
         # Verify only one remains
         events = load_events_from_calendar_file(self.data_dir / "adsv_events_public.ics")
         self.assertEqual(len(events), 1)
-        self.assertEqual(events[0].uid, "ghdiscussion_test_multi_2")
+        self.assertEqual([e.uid for e in events], ["ghdiscussion_test_multi_2"])
+
+    def test_calendar_cache_hit(self):
+        """Test that a calendar written by the bot is reloaded without parsing."""
+        process_discussion("test_cache_1", self.discussion_body, self.data_dir)
+        calendar_path = self.data_dir / "adsv_events_public.ics"
+        
+        with mock.patch("calendar_bot.utils.ics.Calendar", side_effect=AssertionError):
+            events = load_events_from_calendar_file(calendar_path)
+            process_discussion("test_cache_2", self.discussion_body, self.data_dir)
+            events_after_update = load_events_from_calendar_file(calendar_path)
+        
+        self.assertEqual([e.uid for e in events], ["ghdiscussion_test_cache_1"])
+        self.assertEqual(
+            {e.uid for e in events_after_update},
+            {"ghdiscussion_test_cache_1", "ghdiscussion_test_cache_2"},
+        )
+
+    def test_calendar_cache_no_aliasing(self):
+        """Test that modifying loaded events does not affect later loads."""
+        process_discussion("test_alias", self.discussion_body, self.data_dir)
+        calendar_path = self.data_dir / "adsv_events_public.ics"
+        
+        for _ in range(2):
+            events = load_events_from_calendar_file(calendar_path)
+            self.assertEqual([e.name for e in events], ["😃 ADSV Happy Hour"])
+            next(iter(events)).name = "MUTATED"
+            events.clear()
+
+    def test_batch_events(self):
+        """Test processing several discussions in one pass."""
+        modified_body = self.discussion_body.replace("ADSV Happy Hour", "ADSV Holiday Party")
+        results = process_discussions(
+            [
+                ("test_batch_1", self.discussion_body),
+                ("test_batch_2", self.discussion_body),
+                ("test_batch_1", modified_body),
+                ("test_batch_2", self.discussion_body),
+            ],
+            self.data_dir,
+        )
+        
+        self.assertEqual([was_updated for _, was_updated in results], [True, True, True, False])
+        events = load_events_from_calendar_file(self.data_dir / "adsv_events_public.ics")
+        self.assertEqual(
+            {e.uid: e.name for e in events},
+            {
+                "ghdiscussion_test_batch_1": "😃 ADSV Holiday Party",
+                "ghdiscussion_test_batch_2": "😃 ADSV Happy Hour",
+            },
+        )
+        for uid in ("ghdiscussion_test_batch_1", "ghdiscussion_test_batch_2"):
+            event_file = self.data_dir / f"individual_events/{uid}.ics"
+            events = ics.Calendar(event_file.read_text(encoding="utf-8")).events
+            self.assertEqual([e.uid for e in events], [uid])
+
+    def test_cli_reports_parser_error(self):
+        """Test the CLI error contract relied on by the workflow."""
+        bad_body = self.discussion_body.replace("2024-11-30 17:00:00", "tomorrow at five")
+        argv = [
+            "calendar-bot",
+            "--discussion_number", "test_cli_error",
+            "--body", bad_body,
+            "--data_dir", str(self.data_dir),
+        ]
+        with (
+            mock.patch("sys.argv", argv),
+            mock.patch("sys.stderr", new_callable=io.StringIO) as stderr,
+            self.assertRaises(SystemExit) as cm,
+        ):
+            main()
+        self.assertEqual(cm.exception.code, 1)
+        self.assertTrue(
+            stderr.getvalue().startswith("EventFormParserError: Could not parse time")
+        )
+
+    def test_batch_cli_rejects_bad_input(self):
+        """Test that bad --batch input is reported as a usage error."""
+        batch_path = self.data_dir / "batch.jsonl"
+        self.data_dir.mkdir(exist_ok=True)
+        self.addCleanup(batch_path.unlink, missing_ok=True)
+        
+        cases = [
+            ('{"discussion_number": 1, "body": "x"}\n{not json\n', [], "line 2"),
+            ('{"discussion_number": 1}\n', [], "line 1"),
+            ('[1, "x"]\n', [], "line 1"),
+            ('{"discussion_number": 1, "body": null}\n', [], "line 1: body"),
+            ('{"discussion_number": 1, "body": 5}\n', [], "line 1: body"),
+            ('{"discussion_number": null, "body": "x"}\n', [], "line 1: discussion_number"),
+            ('{"discussion_number": " ", "body": "x"}\n', [], "line 1: discussion_number"),
+            ('{"discussion_number": true, "body": "x"}\n', [], "line 1: discussion_number"),
+            ('{"discussion_number": 1, "body": "x"}\n', ["--body", ""], "cannot be combined"),
+        ]
+        for content, extra_args, message in cases:
+            batch_path.write_text(content, encoding="utf-8")
+            argv = ["calendar-bot", "--batch", str(batch_path), "--data_dir", str(self.data_dir)]
+            with (
+                mock.patch("sys.argv", argv + extra_args),
+                mock.patch("sys.stderr", new_callable=io.StringIO) as stderr,
+                self.assertRaises(SystemExit) as cm,
+            ):
+                main()
+            self.assertEqual(cm.exception.code, 2)
+            self.assertIn(message, stderr.getvalue())
+        
+        # Missing --batch file
+        missing_path = self.data_dir / "missing.jsonl"
+        argv = ["calendar-bot", "--batch", str(missing_path), "--data_dir", str(self.data_dir)]
+        with (
+            mock.patch("sys.argv", argv),
+            mock.patch("sys.stderr", new_callable=io.StringIO) as stderr,
+            self.assertRaises(SystemExit) as cm,
+        ):
+            main()
+        self.assertEqual(cm.exception.code, 2)
+        self.assertIn("cannot read --batch file", stderr.getvalue())
 
 
 if __name__ == "__main__":